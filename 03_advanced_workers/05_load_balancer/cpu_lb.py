@@ -39,7 +39,8 @@ async def validate_data(text: str) -> dict:
     word_count = len(words)
     avg_word_length = char_count / word_count if word_count > 0 else 0
 
-    process_time = (time.time() - start_time) * 1000
+    end_time = time.time()
+    process_time = (end_time - start_time) * 1000
 
     return {
         "status": "success",
@@ -48,7 +49,7 @@ async def validate_data(text: str) -> dict:
         "word_count": word_count,
         "average_word_length": round(avg_word_length, 2),
         "process_time_ms": round(process_time, 2),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": datetime.fromtimestamp(end_time, timezone.utc).isoformat(),
     }
 
 
@@ -69,24 +70,22 @@ async def transform_data(text: str, operation: str = "uppercase") -> dict:
     if not text or not text.strip():
         raise ValueError("text cannot be empty")
 
-    valid_operations = ["uppercase", "lowercase", "reverse", "title"]
+    operations = {
+        "uppercase": str.upper,
+        "lowercase": str.lower,
+        "reverse": lambda s: s[::-1],
+        "title": str.title,
+    }
 
-    if operation not in valid_operations:
-        raise ValueError(f"operation must be one of: {', '.join(valid_operations)}")
+    transform = operations.get(operation)
+    if transform is None:
+        raise ValueError(f"operation must be one of: {', '.join(operations)}")
 
     start_time = time.time()
-    result = ""
-
-    if operation == "uppercase":
-        result = text.upper()
-    elif operation == "lowercase":
-        result = text.lower()
-    elif operation == "reverse":
-        result = text[::-1]
-    elif operation == "title":
-        result = text.title()
+    result = transform(text)
 
-    process_time = (time.time() - start_time) * 1000
+    end_time = time.time()
+    process_time = (end_time - start_time) * 1000
 
     return {
         "status": "success",
@@ -94,7 +93,7 @@ async def transform_data(text: str, operation: str = "uppercase") -> dict:
         "transformed": result,
         "operation": operation,
         "process_time_ms": round(process_time, 2),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": datetime.fromtimestamp(end_time, timezone.utc).isoformat(),
     }
 
 
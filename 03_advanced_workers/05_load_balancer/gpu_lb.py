@@ -30,6 +30,8 @@ async def compute_intensive(numbers: list[float]) -> dict:
     import time
     from datetime import datetime, timezone
 
+    import torch
+
     if not numbers:
         return {
             "status": "error",
@@ -37,12 +39,24 @@ async def compute_intensive(numbers: list[float]) -> dict:
         }
     start_time = time.time()
 
-    result = sum(x**2 for x in numbers)
-    mean = sum(numbers) / len(numbers)
-    max_val = max(numbers)
-    min_val = min(numbers)
-
-    compute_time = (time.time() - start_time) * 1000
+    # small lists are dominated by the host-to-device copy, so only
+    # reduce on the GPU once the input is large enough to pay for it
+    if torch.cuda.is_available() and len(numbers) >= 8192:
+        device = "cuda"
+        t = torch.tensor(numbers, dtype=torch.float64, device=device)
+        # stack the reductions so the results come back in a single sync
+        result, mean, max_val, min_val = torch.stack(
+            [torch.dot(t, t), t.mean(), t.max(), t.min()]
+        ).tolist()
+    else:
+        device = "cpu"
+        result = sum(x**2 for x in numbers)
+        mean = sum(numbers) / len(numbers)
+        max_val = max(numbers)
+        min_val = min(numbers)
+
+    end_time = time.time()
+    compute_time = (end_time - start_time) * 1000
 
     return {
         "status": "success",
@@ -51,8 +65,9 @@ async def compute_intensive(numbers: list[float]) -> dict:
         "mean": mean,
         "max": max_val,
         "min": min_val,
+        "device": device,
         "compute_time_ms": round(compute_time, 2),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": datetime.fromtimestamp(end_time, timezone.utc).isoformat(),
     }
 
 
@@ -23,35 +23,72 @@ api = Endpoint(
 @api.get("/images")
 async def list_images_in_volume() -> dict:
     """List generated images from the shared volume."""
+    import asyncio
     import os
 
     image_dir = "/runpod-volume/generated_images"
-    if not os.path.isdir(image_dir):
-        return {"status": "success", "images": []}
+    image_extensions = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+
+    def scan_images() -> list[str]:
+        if not os.path.isdir(image_dir):
+            return []
+        # scandir entries carry the file type from the directory read,
+        # so filtering does not cost an extra stat() per file
+        with os.scandir(image_dir) as entries:
+            return [
+                entry.name
+                for entry in entries
+                if not entry.name.startswith(".")
+                and entry.is_file(follow_symlinks=False)
+                and entry.name.lower().endswith(image_extensions)
+            ]
+
+    # a slow network volume must not stall the event loop
+    images = await asyncio.to_thread(scan_images)
 
     return {
         "status": "success",
-        "images": os.listdir(image_dir),
+        "images": images,
     }
 
 
 @api.get("/images/{file_name}")
 async def get_image_from_volume(file_name: str) -> dict:
     """Get image metadata from the shared volume."""
+    import asyncio
     import base64
+    import mmap
+    import os
     from pathlib import Path
 
+    def read_base64(path: Path) -> tuple[int, str] | None:
+        # encode straight from a read-only mapping of the file so the raw
+        # image is never copied into a Python bytes object first; a missing
+        # file is detected by the open itself rather than a separate check
+        try:
+            f = path.open("rb")
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                # mmap cannot map an empty file
+                return 0, ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return size, base64.b64encode(mm).decode("utf-8")
+
     image_path = Path(f"/runpod-volume/generated_images/{file_name}")
 
-    if not image_path.is_file():
+    result = await asyncio.to_thread(read_base64, image_path)
+    if result is None:
         return {"status": "error", "error": "file not found"}
 
-    image_bytes = image_path.read_bytes()
+    size_bytes, image_base64 = result
     return {
         "status": "success",
         "filename": image_path.name,
-        "size_bytes": len(image_bytes),
-        "image_base64": base64.b64encode(image_bytes).decode("utf-8"),
+        "size_bytes": size_bytes,
+        "image_base64": image_base64,
     }
 
 
@@ -8,6 +8,12 @@ from runpod_flash import Endpoint, GpuType, DataCenter, NetworkVolume
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = "/runpod-volume/models"
+# compiled U-Net kernels, kept on the volume so they outlive each worker
+INDUCTOR_CACHE = "/runpod-volume/torchinductor"
+
+# prompts per U-Net batch; also the number of jobs a worker accepts at
+# once, since batching only helps when requests overlap on one worker
+BATCH_SIZE = 1
 
 volume = NetworkVolume(
     name="flash-05-volume",
@@ -23,65 +29,270 @@ volume = NetworkVolume(
     idle_timeout=300,
     datacenter=DataCenter.EU_RO_1,
     volume=volume,
-    env={"HF_HUB_CACHE": MODEL_PATH, "MODEL_PATH": MODEL_PATH},
-    dependencies=["torch", "diffusers", "transformers", "accelerate"],
+    max_concurrency=BATCH_SIZE,
+    env={
+        "HF_HUB_CACHE": MODEL_PATH,
+        "MODEL_PATH": MODEL_PATH,
+        "TORCHINDUCTOR_CACHE_DIR": INDUCTOR_CACHE,
+        "TORCHINDUCTOR_FX_GRAPH_CACHE": "1",
+        "SD_BATCH": str(BATCH_SIZE),
+        # skip Hugging Face network probes during cold starts
+        "HF_HUB_DISABLE_TELEMETRY": "1",
+        "TRANSFORMERS_NO_ADVISORY_WARNINGS": "1",
+    },
+    dependencies=[
+        "torch",
+        "diffusers",
+        "transformers",
+        "accelerate",
+    ],
 )
 class SimpleSD:
     def __init__(self):
         import gc
         import logging
         import os
+        from concurrent.futures import ThreadPoolExecutor
 
         import torch
-        from diffusers import StableDiffusionPipeline
+        from diffusers import DPMSolverMultistepScheduler, StableDiffusionPipeline
 
         self.logger = logging.getLogger(__name__)
         model_path = os.getenv("MODEL_PATH")
 
+        # SD_QUANT picks the precision: fp16 (default), bf16, or fp16 with
+        # int8 U-Net weights (the text encoder and VAE stay fp16)
+        quant = os.getenv("SD_QUANT", "fp16")
+        if quant not in ("fp16", "bf16", "int8"):
+            raise ValueError(f"SD_QUANT must be fp16, bf16 or int8, got '{quant}'")
+
         self.logger.info("Initializing compact Stable Diffusion model...")
 
         self.pipe = StableDiffusionPipeline.from_pretrained(
             "runwayml/stable-diffusion-v1-5",
-            torch_dtype=torch.float16,
+            torch_dtype=torch.bfloat16 if quant == "bf16" else torch.float16,
             safety_checker=None,
             use_safetensors=True,
             requires_safety_checker=False,
             low_cpu_mem_usage=True,
         )
 
-        self.pipe = self.pipe.to("cuda")
-        self.pipe.enable_attention_slicing()
+        # DPM-Solver++ with Karras sigmas reaches comparable quality in about
+        # half the steps of the default PNDM scheduler
+        self.pipe.scheduler = DPMSolverMultistepScheduler.from_config(
+            self.pipe.scheduler.config,
+            algorithm_type="dpmsolver++",
+            use_karras_sigmas=True,
+        )
+        self.num_inference_steps = int(os.getenv("SD_STEPS", "10"))
+
+        # with SD_BATCH > 1, concurrent prompts are batched into one pipeline
+        # call: up to SD_BATCH prompts arriving within SD_BATCH_MS of the first
+        self.batch_size = int(os.getenv("SD_BATCH", "1"))
+        self.batch_ms = float(os.getenv("SD_BATCH_MS", "25"))
+        self._batch_loop = None
+        self._batch_queue = None
+        self._batch_task = None
+
+        # every pipeline call, warm-up included, runs on this one thread so
+        # CUDA graphs are replayed on the thread that recorded them
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self.output_dir = "/runpod-volume/generated_images"
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # SD_IMAGE_FORMAT=webp encodes several times faster than PNG at the
+        # cost of lossy output; the CPU worker lists and serves both
+        self.image_format = os.getenv("SD_IMAGE_FORMAT", "png").lower()
+        if self.image_format not in ("png", "webp"):
+            raise ValueError(
+                f"SD_IMAGE_FORMAT must be png or webp, got '{self.image_format}'"
+            )
+
+        if quant == "int8":
+            try:
+                from optimum.quanto import freeze, qint8, quantize
+            except ImportError as e:
+                raise RuntimeError(
+                    "SD_QUANT=int8 needs optimum-quanto; add it to the "
+                    "worker's dependencies"
+                ) from e
+
+            quantize(self.pipe.unet, weights=qint8)
+            freeze(self.pipe.unet)
+
+        # SD_OFFLOAD=1 parks each submodule on the CPU and moves it to the GPU
+        # only while it runs, freeing VRAM at the cost of PCIe transfers
+        offload = os.getenv("SD_OFFLOAD") == "1"
+        if offload:
+            self.pipe.enable_model_cpu_offload()
+        else:
+            self.pipe = self.pipe.to("cuda")
+        self.pipe.set_progress_bar_config(disable=True)
+
+        # attention slicing saves memory but slows generation on cards
+        # with enough VRAM, so only enable it when asked to
+        if os.getenv("SD_LOW_VRAM") == "1":
+            self.pipe.enable_attention_slicing()
+
+        # CUDA-graph replay needs weights at fixed device addresses, which
+        # offload hooks move on every call, and the quanto int8 U-Net is
+        # untested with compile and channels_last, so both keep the eager path
+        optimize_unet = not offload and quant != "int8"
+
+        # channels_last lets the U-Net and VAE convolutions use tensor cores
+        # without layout conversions
+        if optimize_unet:
+            self.pipe.unet.to(memory_format=torch.channels_last)
+            self.pipe.vae.to(memory_format=torch.channels_last)
+
+        # torch 2 pipelines already use fused scaled-dot-product attention;
+        # older torch needs xformers for a memory-efficient kernel
+        if not hasattr(torch.nn.functional, "scaled_dot_product_attention"):
+            try:
+                self.pipe.enable_xformers_memory_efficient_attention()
+            except ImportError as e:
+                self.logger.warning(
+                    f"xformers unavailable, using default attention: {e}"
+                )
+
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision("high")
+
+        # the U-Net runs once per denoising step, so compile it and warm up
+        # here to pay for autotuning and compilation before the first request;
+        # with the inductor cache on the volume, only the first worker ever
+        # compiles and later cold starts just load kernels and warm up
+        if optimize_unet:
+            unet = self.pipe.unet
+            try:
+                self.pipe.unet = torch.compile(
+                    unet, mode="reduce-overhead", fullgraph=True
+                )
+                self._executor.submit(self._warm_up).result()
+            except (AttributeError, RuntimeError) as e:
+                self.logger.warning(
+                    f"torch.compile unavailable, using eager U-Net: {e}"
+                )
+                self.pipe.unet = unet
 
         gc.collect()
         torch.cuda.empty_cache()
 
         self.logger.info("Compact Stable Diffusion initialized successfully!")
-        self.logger.info(
-            f"Model weights stored in {model_path}: {os.listdir(model_path)}"
-        )
+        # listing the volume is a round-trip to network storage, so skip it
+        # when the message would be filtered out anyway
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(
+                f"Model weights stored in {model_path}: {os.listdir(model_path)}"
+            )
+
+    def _warm_up(self) -> None:
+        """Compile and record the U-Net for every batch size it will see."""
+        import torch
+
+        # each batch size is a distinct input shape; three steps let the
+        # graph for each one be both recorded and replayed before serving
+        with torch.inference_mode():
+            for size in range(1, self.batch_size + 1):
+                self.pipe(
+                    prompt=["warmup"] * size,
+                    num_inference_steps=3,
+                    width=512,
+                    height=512,
+                )
+
+    def _run_pipe(self, prompts: list[str]) -> list:
+        """Run one batched pipeline call and return an image per prompt."""
+        import torch
+
+        # no gradients are needed, so skip autograd version tracking
+        with torch.inference_mode():
+            return self.pipe(
+                prompt=prompts,
+                num_inference_steps=self.num_inference_steps,
+                guidance_scale=7.5,
+                width=512,
+                height=512,
+            ).images
+
+    async def _drain_batches(self) -> None:
+        """Collect queued prompts into batches and resolve their futures."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._batch_queue.get()]
+            deadline = loop.time() + self.batch_ms / 1000
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._batch_queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            prompts = [prompt for prompt, _ in batch]
+            self.logger.info(f"Generating batch of {len(prompts)} image(s)")
+            try:
+                images = await loop.run_in_executor(
+                    self._executor, self._run_pipe, prompts
+                )
+            except Exception as e:
+                self.logger.exception("Batch generation failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), image in zip(batch, images):
+                if not future.done():
+                    future.set_result(image)
 
     async def generate_image(self, prompt: str) -> dict:
         """Generate a single image from prompt."""
+        import asyncio
+
         self.logger.info(f"Generating image for: '{prompt}'")
 
-        image = self.pipe(
-            prompt=prompt,
-            num_inference_steps=20,
-            guidance_scale=7.5,
-            width=512,
-            height=512,
-        ).images[0]
+        loop = asyncio.get_running_loop()
+        if self.batch_size == 1:
+            # nothing to batch with, so skip the queue and its wait window
+            images = await loop.run_in_executor(
+                self._executor, self._run_pipe, [prompt]
+            )
+            image = images[0]
+        else:
+            # the queue and drain task belong to the running event loop
+            if self._batch_loop is not loop:
+                self._batch_loop = loop
+                self._batch_queue = asyncio.Queue()
+                self._batch_task = loop.create_task(self._drain_batches())
+
+            future = loop.create_future()
+            await self._batch_queue.put((prompt, future))
+            image = await future
 
         import datetime
         import os
-
-        output_dir = "/runpod-volume/generated_images"
-        os.makedirs(output_dir, exist_ok=True)
+        import uuid
 
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        image_filename = f"sd_generated_{timestamp}.png"
-        image_path = os.path.join(output_dir, image_filename)
-        image.save(image_path)
+        # batched and concurrent requests can finish within the same second,
+        # so a random suffix keeps their filenames from colliding
+        image_id = uuid.uuid4().hex[:8]
+        image_filename = f"sd_generated_{timestamp}_{image_id}.{self.image_format}"
+        image_path = os.path.join(self.output_dir, image_filename)
+        # encoding is CPU-bound, so keep it off the event loop and favour
+        # encoding speed over file size
+        if self.image_format == "webp":
+            save_kwargs = {"format": "WEBP", "quality": 90, "method": 0}
+        else:
+            save_kwargs = {"format": "PNG", "compress_level": 1, "optimize": False}
+        await asyncio.to_thread(image.save, image_path, **save_kwargs)
         self.logger.info(f"Image saved to: {image_path}")
 
         return {
@@ -89,7 +300,7 @@ class SimpleSD:
             "image_path": image_path,
             "timestamp": timestamp,
             "generation_params": {
-                "num_inference_steps": 20,
+                "num_inference_steps": self.num_inference_steps,
                 "guidance_scale": 7.5,
                 "width": 512,
                 "height": 512,